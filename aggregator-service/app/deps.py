@@ -0,0 +1,6 @@
+import secrets
+from typing import Optional
+from fastapi import Header
+
+def get_correlation_id(x_correlation_id: Optional[str] = Header(None)):
+    return x_correlation_id or secrets.token_hex(16)
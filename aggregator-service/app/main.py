@@ -0,0 +1,225 @@
+from fastapi import FastAPI, Depends, HTTPException, Request
+import asyncio
+import os
+import httpx
+import msgspec
+from cachetools import TLRUCache
+
+from . import schemas
+from .metrics import MetricsMiddleware, metrics_endpoint
+from .deps import get_correlation_id
+
+# ----- Init -----
+app = FastAPI(title="aggregator-service", version="v1")
+app.add_middleware(MetricsMiddleware, service_name="aggregator-service")
+
+# ----- Config (URLs from env, default to docker-compose service names) -----
+CUSTOMER_SERVICE_URL = os.getenv("CUSTOMER_SERVICE_URL", "http://customer-service:8000")
+RESTAURANT_SERVICE_URL = os.getenv("RESTAURANT_SERVICE_URL", "http://restaurant-service:8001")
+
+CUSTOMER_BASE_URL = f"{CUSTOMER_SERVICE_URL}/v1/customers/"
+VALIDATE_ITEMS_URL = f"{RESTAURANT_SERVICE_URL}/internal/v1/validate-items"
+
+# Customer lookups (email + addresses) are cached briefly per customer_id
+CUSTOMER_CACHE_TTL = float(os.getenv("CUSTOMER_CACHE_TTL", "30"))
+CUSTOMER_CACHE_MAXSIZE = int(os.getenv("CUSTOMER_CACHE_MAXSIZE", "10000"))
+
+
+# ----- Shared HTTP client (one connection pool for all downstream calls) -----
+@app.on_event("startup")
+async def startup_http_client():
+    # h2 is only negotiated (via ALPN) with TLS upstreams; the plain-http
+    # defaults fall back to HTTP/1.1 with keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await app.state.http.aclose()
+
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http
+
+
+# ----- Infra Endpoints -----
+@app.get("/health")
+def health():
+    return {"status": "ok", "service": "aggregator-service"}
+
+
+@app.get("/metrics")
+def metrics():
+    return metrics_endpoint()
+
+
+# ----- Helper: Cached Customer Lookup -----
+
+# Mirrors the customer cache in order-service/app/main.py (TTL, Cache-Control,
+# in-flight sharing, refetch on a missing address). The services share no code,
+# so a fix to one copy must be made to the other.
+# values are (customer payload, ttl seconds); each entry expires after its own ttl
+_customer_cache = TLRUCache(
+    maxsize=CUSTOMER_CACHE_MAXSIZE,
+    ttu=lambda _key, value, now: now + value[1],
+)
+_customer_lookups: dict[int, asyncio.Task] = {}
+
+
+def _cache_ttl(cache_control: str | None) -> float:
+    # honor upstream Cache-Control, capped at our own TTL
+    if not cache_control:
+        return CUSTOMER_CACHE_TTL
+    for directive in cache_control.lower().split(","):
+        directive = directive.strip()
+        if directive in ("no-store", "no-cache"):
+            return 0
+        if directive.startswith("max-age="):
+            try:
+                return min(float(directive[len("max-age="):]), CUSTOMER_CACHE_TTL)
+            except ValueError:
+                return 0
+    return CUSTOMER_CACHE_TTL
+
+
+async def _lookup_customer(client, customer_id: int, cid: str):
+    r = await client.get(CUSTOMER_BASE_URL + str(customer_id),
+                         headers={"X-Correlation-Id": cid})
+    if r.status_code != 200:
+        return None
+    try:
+        data = r.json()
+    except ValueError:
+        return None
+
+    ttl = _cache_ttl(r.headers.get("cache-control"))
+    if ttl > 0:
+        _customer_cache[customer_id] = (data, ttl)
+    return data
+
+
+async def fetch_customer(client, customer_id: int, cid: str):
+    cached = _customer_cache.get(customer_id)
+    if cached is not None:
+        return cached[0]
+
+    # one in-flight lookup per customer; concurrent orders share its result,
+    # including misses that aren't cached (404, no-store)
+    task = _customer_lookups.get(customer_id)
+    if task is None or task.done():
+        task = asyncio.create_task(_lookup_customer(client, customer_id, cid))
+        _customer_lookups[customer_id] = task
+
+        def forget(t: asyncio.Task):
+            if _customer_lookups.get(customer_id) is t:
+                del _customer_lookups[customer_id]
+
+        task.add_done_callback(forget)
+    # shielded so one cancelled request doesn't cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+def _has_address(data: dict, address_id: int) -> bool:
+    return any(a["address_id"] == address_id for a in data.get("addresses", []))
+
+
+# ----- Helper: Customer + Address -----
+
+async def fetch_customer_email(client, customer_id: int, address_id: int | None, cid: str):
+    data = await fetch_customer(client, customer_id, cid)
+    if not isinstance(data, dict):
+        raise HTTPException(
+            400,
+            {"code": "INVALID_CUSTOMER", "correlationId": cid},
+        )
+
+    if address_id is not None and not _has_address(data, address_id):
+        # the cached payload may predate a newly added address; look again
+        # before rejecting
+        _customer_cache.pop(customer_id, None)
+        data = await fetch_customer(client, customer_id, cid)
+        if not isinstance(data, dict) or not _has_address(data, address_id):
+            raise HTTPException(
+                400,
+                {
+                    "code": "INVALID_ADDRESS_FOR_CUSTOMER",
+                    "correlationId": cid,
+                },
+            )
+
+    return data.get("email")
+
+
+# ----- Helper: Restaurant + Items -----
+
+async def validate_items(client, restaurant_id: int, items: list, cid: str):
+    body = {
+        "restaurant_id": restaurant_id,
+        "items": [{"item_id": it.item_id, "quantity": it.quantity} for it in items],
+    }
+    r = await client.post(VALIDATE_ITEMS_URL,
+                          json=body,
+                          headers={"X-Correlation-Id": cid})
+    if r.status_code != 200:
+        raise HTTPException(
+            502,
+            {"code": "MENU_VALIDATION_FAILED", "correlationId": cid},
+        )
+
+    try:
+        v = msgspec.json.decode(r.content, type=schemas.ValidateItemsResponse)
+    except msgspec.DecodeError:
+        v = None
+    # invalid selections pass through with their reason; valid=true without a
+    # total or items is a broken upstream, not an order we can price
+    if v is None or (v.valid and (v.total is None or not v.items)):
+        raise HTTPException(
+            502,
+            {"code": "MENU_VALIDATION_FAILED", "correlationId": cid},
+        )
+    return v
+
+
+# ----- API: Prepare Order (customer + menu validation in one call) -----
+
+
+@app.post("/internal/v1/prepare-order", response_model=schemas.PrepareOrderResponse)
+async def prepare_order(
+    payload: schemas.PrepareOrderRequest,
+    cid: str = Depends(get_correlation_id),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    """
+    Fans out to customer-service and restaurant-service concurrently so the
+    order-service only pays for one round-trip before creating the order.
+    Customer lookup is skipped when no customer_id is sent.
+    """
+    if not payload.items:
+        raise HTTPException(400, {"code": "EMPTY_ORDER", "correlationId": cid})
+
+    if payload.customer_id is None:
+        customer_email = None
+        v = await validate_items(client, payload.restaurant_id, payload.items, cid)
+    else:
+        customer_email, v = await asyncio.gather(
+            fetch_customer_email(client, payload.customer_id, payload.address_id, cid),
+            validate_items(client, payload.restaurant_id, payload.items, cid),
+        )
+
+    if not v.valid:
+        return {
+            "customer_email": customer_email,
+            "valid": False,
+            "reason": v.reason,
+        }
+
+    return {
+        "customer_email": customer_email,
+        "valid": True,
+        "items": msgspec.to_builtins(v.items),
+        "total": v.total,
+    }
@@ -0,0 +1,41 @@
+import time
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "Total HTTP requests",
+    ["service", "method", "path", "status"]
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency in seconds",
+    ["service", "method", "path"]
+)
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, service_name: str):
+        super().__init__(app)
+        self.service_name = service_name
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.time()
+        response = await call_next(request)
+        latency = time.time() - start
+
+        path = request.url.path
+        method = request.method
+        status = response.status_code
+
+        REQUEST_COUNT.labels(self.service_name, method, path, status).inc()
+        REQUEST_LATENCY.labels(self.service_name, method, path).observe(latency)
+
+        return response
+
+
+def metrics_endpoint():
+    data = generate_latest()
+    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
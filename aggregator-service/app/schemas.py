@@ -0,0 +1,48 @@
+from decimal import Decimal
+import msgspec
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class PrepareOrderItem(BaseModel):
+    item_id: int
+    quantity: int
+
+
+class PrepareOrderRequest(BaseModel):
+    customer_id: Optional[int] = None   # omitted when the caller already has the email
+    address_id: Optional[int] = None
+    restaurant_id: int
+    items: List[PrepareOrderItem]
+
+
+class PreparedItem(BaseModel):
+    item_id: int
+    quantity: int
+    unit_price: Decimal
+
+
+class PrepareOrderResponse(BaseModel):
+    customer_email: Optional[str] = None
+    valid: bool
+    reason: Optional[str] = None
+    items: List[PreparedItem] = []
+    total: Optional[Decimal] = None
+
+
+# ----- Internal downstream responses (msgspec: decoded straight from bytes) -----
+
+
+class ValidatedItem(msgspec.Struct):
+    item_id: int
+    quantity: int
+    unit_price: Decimal
+
+
+class ValidateItemsResponse(msgspec.Struct):
+    # total/items are only sent with valid=true; None/[] lets callers reject
+    # a "valid" body that is missing them
+    valid: bool
+    reason: Optional[str] = None
+    total: Optional[Decimal] = None
+    items: List[ValidatedItem] = []
@@ -1,6 +1,12 @@
-import uuid
+import secrets
 from typing import Optional
 from fastapi import Header
 
-def get_correlation_id(x_correlation_id: Optional[str] = Header(None)):
-    return x_correlation_id or str(uuid.uuid4())
+from .logging_config import cid_var
+
+# async so the contextvar is set in the request's own context (sync
+# dependencies run in a threadpool copy of it)
+async def get_correlation_id(x_correlation_id: Optional[str] = Header(None)):
+    cid = x_correlation_id or secrets.token_hex(16)
+    cid_var.set(cid)
+    return cid
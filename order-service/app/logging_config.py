@@ -0,0 +1,23 @@
+import logging
+from contextvars import ContextVar
+
+# correlation id of the request being handled; "-" outside of a request
+cid_var: ContextVar[str] = ContextVar("cid", default="-")
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp every record with the current correlation id so call sites don't pass extra=."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = cid_var.get()
+        return True
+
+
+def setup_logging(service_name: str):
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [%(levelname)s] [{service_name}] [cid=%(correlation_id)s] %(message)s",
+    )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(CorrelationIdFilter())
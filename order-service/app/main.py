@@ -1,26 +1,39 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, text, update
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List
-from datetime import datetime
+from decimal import Decimal
+import asyncio
+import hashlib
+import json
 import logging
 import os
 import httpx
-
-from . import db, models, schemas
-from .metrics import MetricsMiddleware, metrics_endpoint, ORDERS_CREATED
+import msgspec
+from cachetools import TLRUCache
+
+from . import db, models, outbox, schemas
+from .metrics import (
+    MetricsMiddleware,
+    metrics_endpoint,
+    ORDERS_CREATED_CONFIRMED,
+    ORDERS_CREATED_PAYMENT_FAILED,
+)
 from .deps import get_correlation_id
+from .logging_config import cid_var, setup_logging
+from .tracing import setup_tracing
 
 # ----- Logging -----
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] [order-service] [cid=%(correlation_id)s] %(message)s",
-)
+setup_logging("order-service")
 logger = logging.getLogger("order-service")
 
 # ----- Init -----
 db.init_db()
 app = FastAPI(title="order-service", version="v1")
 app.add_middleware(MetricsMiddleware, service_name="order-service")
+setup_tracing(app, db.engine, service_name="order-service")
 
 # ----- Config (URLs from env, default to docker-compose service names) -----
 CUSTOMER_SERVICE_URL = os.getenv("CUSTOMER_SERVICE_URL", "http://customer-service:8000")
@@ -28,6 +41,26 @@ RESTAURANT_SERVICE_URL = os.getenv("RESTAURANT_SERVICE_URL", "http://restaurant-
 PAYMENT_SERVICE_URL = os.getenv("PAYMENT_SERVICE_URL", "http://payment-service:8002")
 DELIVERY_SERVICE_URL = os.getenv("DELIVERY_SERVICE_URL", "http://delivery-service:8003")
 NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:8004")
+AGGREGATOR_SERVICE_URL = os.getenv("AGGREGATOR_SERVICE_URL", "http://aggregator-service:8006")
+
+# Validate customer + menu through aggregator-service in a single call
+USE_AGGREGATOR = os.getenv("USE_AGGREGATOR", "false").lower() == "true"
+
+# Return 202 once the order is durably pending; payment/delivery/notification
+# are driven from the order_events outbox
+USE_OUTBOX = os.getenv("USE_OUTBOX", "false").lower() == "true"
+
+# Downstream endpoints, built once at import instead of per call
+CUSTOMER_BASE_URL = f"{CUSTOMER_SERVICE_URL}/v1/customers/"
+VALIDATE_ITEMS_URL = f"{RESTAURANT_SERVICE_URL}/internal/v1/validate-items"
+PAYMENT_CHARGE_URL = f"{PAYMENT_SERVICE_URL}/v1/payments/charge"
+DELIVERY_ASSIGN_URL = f"{DELIVERY_SERVICE_URL}/v1/deliveries/assign"
+NOTIFICATION_EMAIL_URL = f"{NOTIFICATION_SERVICE_URL}/v1/notifications/email"
+PREPARE_ORDER_URL = f"{AGGREGATOR_SERVICE_URL}/internal/v1/prepare-order"
+
+# Customer lookups (email + addresses) are cached briefly per customer_id
+CUSTOMER_CACHE_TTL = float(os.getenv("CUSTOMER_CACHE_TTL", "30"))
+CUSTOMER_CACHE_MAXSIZE = int(os.getenv("CUSTOMER_CACHE_MAXSIZE", "10000"))
 
 
 # ----- DB Dependency -----
@@ -39,8 +72,54 @@ def get_db():
         s.close()
 
 
-def get_http_client():
-    return httpx.Client(timeout=5.0)
+# ----- Shared HTTP client (one connection pool for all downstream calls) -----
+@app.on_event("startup")
+async def startup_http_client():
+    # h2 is only negotiated (via ALPN) with TLS upstreams; the plain-http
+    # defaults fall back to HTTP/1.1 with keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+
+
+# ----- Outbox dispatcher -----
+OUTBOX_SHUTDOWN_TIMEOUT = float(os.getenv("OUTBOX_SHUTDOWN_TIMEOUT", "10"))
+
+
+@app.on_event("startup")
+async def startup_outbox_dispatcher():
+    if USE_OUTBOX:
+        app.state.outbox_stop = asyncio.Event()
+        app.state.outbox_task = asyncio.create_task(
+            outbox.dispatch_forever({"ORDER_CREATED": handle_order_created}, app.state.outbox_stop)
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_outbox_dispatcher():
+    task = getattr(app.state, "outbox_task", None)
+    if task is None:
+        return
+    # let the in-flight event finish; if it overruns, it's cancelled and left
+    # PROCESSING until its lease expires and a dispatcher picks it up again
+    app.state.outbox_stop.set()
+    try:
+        await asyncio.wait_for(task, timeout=OUTBOX_SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Outbox dispatcher did not stop within %.0fs", OUTBOX_SHUTDOWN_TIMEOUT)
+
+
+# registered after the dispatcher's shutdown, which waits for the in-flight
+# event, so the client is only closed once the dispatcher has stopped
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await app.state.http.aclose()
+
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http
 
 
 # ----- Infra Endpoints -----
@@ -49,26 +128,109 @@ def health():
     return {"status": "ok", "service": "order-service"}
 
 
+@app.get("/ready")
+def ready():
+    # readiness: DB reachable through a pooled connection
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning("Readiness check failed: %s", e)
+        raise HTTPException(503, {"code": "DB_UNAVAILABLE"})
+    return {"status": "ready", "service": "order-service"}
+
+
 @app.get("/metrics")
 def metrics():
     return metrics_endpoint()
 
 
-# ----- Helper: Customer + Address Validation -----
+# ----- Helper: Cached Customer Lookup -----
 
-def validate_customer_and_address(client, customer_id: int, address_id: int | None, cid: str):
+# aggregator-service/app/main.py keeps a copy of this cache for the
+# USE_AGGREGATOR path; changes here must be made there too.
+# values are (customer payload, ttl seconds); each entry expires after its own ttl
+_customer_cache = TLRUCache(
+    maxsize=CUSTOMER_CACHE_MAXSIZE,
+    ttu=lambda _key, value, now: now + value[1],
+)
+_customer_lookups: dict[int, asyncio.Task] = {}
+
+
+def _cache_ttl(cache_control: str | None) -> float:
+    # honor upstream Cache-Control, capped at our own TTL
+    if not cache_control:
+        return CUSTOMER_CACHE_TTL
+    for directive in cache_control.lower().split(","):
+        directive = directive.strip()
+        if directive in ("no-store", "no-cache"):
+            return 0
+        if directive.startswith("max-age="):
+            try:
+                return min(float(directive[len("max-age="):]), CUSTOMER_CACHE_TTL)
+            except ValueError:
+                return 0
+    return CUSTOMER_CACHE_TTL
+
+
+async def _lookup_customer(client, customer_id: int, cid: str):
     # Use public customer endpoint (we already built it)
-    r = client.get(f"{CUSTOMER_SERVICE_URL}/v1/customers/{customer_id}",
-                   headers={"X-Correlation-Id": cid})
+    r = await client.get(CUSTOMER_BASE_URL + str(customer_id),
+                         headers={"X-Correlation-Id": cid})
     if r.status_code != 200:
+        return None
+    try:
+        data = r.json()
+    except ValueError:
+        return None
+
+    ttl = _cache_ttl(r.headers.get("cache-control"))
+    if ttl > 0:
+        _customer_cache[customer_id] = (data, ttl)
+    return data
+
+
+async def fetch_customer(client, customer_id: int, cid: str):
+    cached = _customer_cache.get(customer_id)
+    if cached is not None:
+        return cached[0]
+
+    # one in-flight lookup per customer; concurrent orders share its result,
+    # including misses that aren't cached (404, no-store)
+    task = _customer_lookups.get(customer_id)
+    if task is None or task.done():
+        task = asyncio.create_task(_lookup_customer(client, customer_id, cid))
+        _customer_lookups[customer_id] = task
+
+        def forget(t: asyncio.Task):
+            if _customer_lookups.get(customer_id) is t:
+                del _customer_lookups[customer_id]
+
+        task.add_done_callback(forget)
+    # shielded so one cancelled request doesn't cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+def _has_address(data: dict, address_id: int) -> bool:
+    return any(a["address_id"] == address_id for a in data.get("addresses", []))
+
+
+# ----- Helper: Customer + Address Validation -----
+
+async def validate_customer_and_address(client, customer_id: int, address_id: int | None, cid: str):
+    data = await fetch_customer(client, customer_id, cid)
+    if not isinstance(data, dict):
         raise HTTPException(
             400,
             {"code": "INVALID_CUSTOMER", "correlationId": cid},
         )
 
-    data = r.json()
-    if address_id is not None:
-        if not any(a["address_id"] == address_id for a in data.get("addresses", [])):
+    if address_id is not None and not _has_address(data, address_id):
+        # the cached payload may predate a newly added address; look again
+        # before rejecting
+        _customer_cache.pop(customer_id, None)
+        data = await fetch_customer(client, customer_id, cid)
+        if not isinstance(data, dict) or not _has_address(data, address_id):
             raise HTTPException(
                 400,
                 {
@@ -81,47 +243,114 @@ def validate_customer_and_address(client, customer_id: int, address_id: int | No
     return data.get("email")
 
 
-# ----- Helper: Restaurant + Items Validation -----
+# ----- Helper: Menu Validation Response -----
 
-def validate_restaurant_and_items(client, restaurant_id: int, items: List[schemas.OrderItemRequest], cid: str):
-    if not items:
-        raise HTTPException(400, {"code": "EMPTY_ORDER", "correlationId": cid})
-
-    # Use internal validate-items endpoint we defined in restaurant-service
-    body = {
-        "restaurant_id": restaurant_id,
-        "items": [{"item_id": it.item_id, "quantity": it.quantity} for it in items],
-    }
-    r = client.post(f"{RESTAURANT_SERVICE_URL}/internal/v1/validate-items",
-                    json=body,
-                    headers={"X-Correlation-Id": cid})
+def _decode_menu_response(r: httpx.Response, type_: type, cid: str):
+    # shared by the direct (restaurant-service) and aggregator paths, so both
+    # accept and reject the same bodies
     if r.status_code != 200:
         raise HTTPException(
             502,
             {"code": "MENU_VALIDATION_FAILED", "correlationId": cid},
         )
 
-    v = r.json()
-    if not v.get("valid"):
+    try:
+        v = msgspec.json.decode(r.content, type=type_)
+    except msgspec.DecodeError:
+        v = None
+    # a success body must carry the priced items, not default into a free, empty order
+    if v is None or (v.valid and (v.total is None or not v.items)):
+        raise HTTPException(
+            502,
+            {"code": "MENU_VALIDATION_FAILED", "correlationId": cid},
+        )
+    if not v.valid:
         raise HTTPException(
             400,
             {
                 "code": "INVALID_MENU_SELECTION",
-                "reason": v.get("reason"),
+                "reason": v.reason,
                 "correlationId": cid,
             },
         )
+    return v
+
+
+# ----- Helper: Restaurant + Items Validation -----
+
+async def validate_restaurant_and_items(client, restaurant_id: int, items: List[schemas.OrderItemRequest], cid: str):
+    if not items:
+        raise HTTPException(400, {"code": "EMPTY_ORDER", "correlationId": cid})
+
+    # Use internal validate-items endpoint we defined in restaurant-service
+    body = {
+        "restaurant_id": restaurant_id,
+        "items": [{"item_id": it.item_id, "quantity": it.quantity} for it in items],
+    }
+    r = await client.post(VALIDATE_ITEMS_URL,
+                          json=body,
+                          headers={"X-Correlation-Id": cid})
+    v = _decode_menu_response(r, schemas.ValidateItemsResponse, cid)
 
     # v contains total + item details
     return v
 
 
+# ----- Helper: Customer + Restaurant Validation via aggregator-service -----
+
+async def prepare_order(client, payload: schemas.CreateOrderRequest, cid: str):
+    if not payload.items:
+        raise HTTPException(400, {"code": "EMPTY_ORDER", "correlationId": cid})
+
+    body = {
+        # no customer lookup needed when the caller supplied the email
+        "customer_id": None if payload.customer_email else payload.customer_id,
+        "address_id": payload.address_id,
+        "restaurant_id": payload.restaurant_id,
+        "items": [{"item_id": it.item_id, "quantity": it.quantity} for it in payload.items],
+    }
+    r = await client.post(PREPARE_ORDER_URL,
+                          json=body,
+                          headers={"X-Correlation-Id": cid})
+    if r.status_code == 400:
+        # customer/address errors keep the codes the direct path uses; a 400
+        # without our error shape (e.g. from a proxy) is treated as a 502
+        try:
+            code = r.json()["detail"]["code"]
+        except (ValueError, KeyError, TypeError):
+            code = None
+        if isinstance(code, str):
+            raise HTTPException(
+                400,
+                {"code": code, "correlationId": cid},
+            )
+    v = _decode_menu_response(r, schemas.PrepareOrderResponse, cid)
+
+    # v contains customer_email + total + item details
+    return payload.customer_email or v.customer_email, v
+
+
 # ----- Helper: Call Payment-Service -----
 
-def call_payment_service(client, order: models.Order, method: str, email: str | None, cid: str):
+class PaymentServiceUnavailable(Exception):
+    """payment-service gave no definitive answer (5xx, 429, unexpected reply)."""
+
+
+def _json_object(r: httpx.Response) -> dict | None:
+    try:
+        data = r.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def call_payment_service(client, order: models.Order, method: str, email: str | None, cid: str):
+    # normalised to cents: a fresh Decimal('10.5') and one reloaded from
+    # Numeric(10, 2) as Decimal('10.50') must give the same idempotency key
+    amount = Decimal(str(order.order_total)).quantize(Decimal("0.01"))
     payload = {
         "order_id": order.order_id,
-        "amount": order.order_total,
+        "amount": float(amount),
         "method": method,
         "reference": f"ORDER-{order.order_id}",
         "force_fail": False,
@@ -132,96 +361,76 @@ def call_payment_service(client, order: models.Order, method: str, email: str |
     }
     if email:
         headers["X-Customer-Email"] = email
-    # idempotency: one key per order
-    headers["Idempotency-Key"] = f"order-{order.order_id}-payment"
-
-    r = client.post(f"{PAYMENT_SERVICE_URL}/v1/payments/charge",
-                    json=payload,
-                    headers=headers)
+    # idempotency: one key per (order, amount, method), so a retry with a
+    # changed amount is never deduplicated against the original charge
+    headers["Idempotency-Key"] = hashlib.blake2b(
+        f"{order.order_id}|{amount}|{method}".encode(),
+        digest_size=16,
+    ).hexdigest()
+
+    r = await client.post(PAYMENT_CHARGE_URL,
+                          json=payload,
+                          headers=headers)
+
+    # True = charged, False = declined; anything without a definitive answer
+    # raises so the caller can decide whether to retry
+    data = _json_object(r)
+    if r.status_code == 201 and data is not None:
+        return data.get("status") == "SUCCESS"
 
-    if r.status_code == 201:
-        data = r.json()
-        if data.get("status") == "SUCCESS":
-            return True
+    # If failed with structured error
+    if 400 <= r.status_code < 500 and r.status_code != 429 and data is not None:
         return False
 
-    # If failed with structured error
-    return False
+    raise PaymentServiceUnavailable(f"payment-service returned {r.status_code}")
 
 
 # ----- Helper: Call Delivery-Service -----
 
-def call_delivery_assign(client, order_id: int, cid: str):
+class DeliveryServiceUnavailable(Exception):
+    """delivery-service gave no definitive answer (5xx, 429)."""
+
+
+async def call_delivery_assign(client, order_id: int, cid: str):
     payload = {"order_id": order_id}
-    r = client.post(f"{DELIVERY_SERVICE_URL}/v1/deliveries/assign",
-                    json=payload,
-                    headers={"X-Correlation-Id": cid})
-    return r.status_code == 201
+    r = await client.post(DELIVERY_ASSIGN_URL,
+                          json=payload,
+                          headers={"X-Correlation-Id": cid})
+
+    # True = assigned, False = refused; anything else raises like payment does
+    if r.status_code == 201:
+        return True
+    if 400 <= r.status_code < 500 and r.status_code != 429:
+        return False
+    raise DeliveryServiceUnavailable(f"delivery-service returned {r.status_code}")
 
 
 # ----- Helper: Notify via notification-service -----
 
-def notify(event_type: str, recipient: str | None, subject: str, message: str, cid: str):
+async def notify(client, event_type: str, recipient: str | None, subject: str, message: str, cid: str):
     if not (NOTIFICATION_SERVICE_URL and recipient):
         return
     try:
-        with get_http_client() as client:
-            client.post(
-                f"{NOTIFICATION_SERVICE_URL}/v1/notifications/email",
-                json={
-                    "event_type": event_type,
-                    "recipient": recipient,
-                    "subject": subject,
-                    "message": message,
-                    "correlation_id": cid,
-                },
-                headers={"X-Correlation-Id": cid},
-            )
+        await client.post(
+            NOTIFICATION_EMAIL_URL,
+            json={
+                "event_type": event_type,
+                "recipient": recipient,
+                "subject": subject,
+                "message": message,
+                "correlation_id": cid,
+            },
+            headers={"X-Correlation-Id": cid},
+        )
     except Exception as e:
-        logger.warning(f"Failed to send order notification: {e}",
-                       extra={"correlation_id": cid})
-
-
-# ----- API: Create Order (Main Orchestration) -----
-
-
-@app.post("/v1/orders", response_model=schemas.OrderRead, status_code=201)
-def create_order(
-    payload: schemas.CreateOrderRequest,
-    db_sess: Session = Depends(get_db),
-    cid: str = Depends(get_correlation_id),
-):
-    """
-    Orchestration flow:
-    1. Validate customer + address via customer-service.
-    2. Validate restaurant + items via restaurant-service.
-    3. Create order + order_items locally.
-    4. Call payment-service.
-    5. On success → call delivery-service.
-    6. Send notifications.
-    """
-    client = get_http_client()
-
-    # 1. Validate customer & address
-    customer_email = payload.customer_email or validate_customer_and_address(
-        client,
-        payload.customer_id,
-        payload.address_id,
-        cid,
-    )
+        logger.warning("Failed to send order notification: %s", e)
 
-    # 2. Validate restaurant & items + compute total from authoritative prices
-    valid = validate_restaurant_and_items(
-        client,
-        payload.restaurant_id,
-        payload.items,
-        cid,
-    )
 
-    total = float(valid["total"])
-    items_details = valid["items"]
+# ----- DB helpers (sync; run in the threadpool from async endpoints) -----
 
-    # 3. Create order & order_items in DB (initially PENDING_PAYMENT)
+def create_pending_order(db_sess: Session, payload: schemas.CreateOrderRequest,
+                         total: Decimal, items_details: List[schemas.ValidatedItem],
+                         event: dict | None = None) -> models.Order:
     order = models.Order(
         customer_id=payload.customer_id,
         restaurant_id=payload.restaurant_id,
@@ -229,42 +438,103 @@ def create_order(
         order_status="PENDING_PAYMENT",
         payment_status="PENDING",
         order_total=total,
-        created_at=datetime.utcnow(),
     )
     db_sess.add(order)
     db_sess.flush()  # get order_id
 
-    for d in items_details:
-        oi = models.OrderItem(
-            order_id=order.order_id,
-            item_id=d["item_id"],
-            quantity=d["quantity"],
-            price=d["unit_price"],
-        )
-        db_sess.add(oi)
+    # one bulk INSERT for all items instead of an ORM object per row
+    rows = [
+        {
+            "order_id": order.order_id,
+            "item_id": d.item_id,
+            "quantity": d.quantity,
+            "price": d.unit_price,
+        }
+        for d in items_details
+    ]
+    if rows:  # an empty executemany would run INSERT ... DEFAULT VALUES
+        db_sess.execute(insert(models.OrderItem), rows)
+
+    # same transaction as the order, so the event exists iff the order does
+    if event is not None:
+        outbox.add_event(db_sess, order.order_id, "ORDER_CREATED", event)
 
     db_sess.commit()
-    db_sess.refresh(order)
+    return order
+
 
-    logger.info(
-        f"Order {order.order_id} created pending payment",
-        extra={"correlation_id": cid},
+def transition_order(db_sess: Session, order: models.Order, from_status: str, **values) -> bool:
+    # single guarded UPDATE; returns False if the order already left from_status.
+    # No in-session synchronisation: "evaluate" would check the WHERE against the
+    # stale in-memory object and apply the values even when the DB row didn't match.
+    result = db_sess.execute(
+        update(models.Order)
+        .where(
+            models.Order.order_id == order.order_id,
+            models.Order.order_status == from_status,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
     )
+    db_sess.commit()
+    if result.rowcount != 1:
+        return False
+    for name, value in values.items():
+        set_committed_value(order, name, value)
+    return True
 
+
+def load_order(db_sess: Session, order_id: int) -> models.Order | None:
+    # items are fetched eagerly so response serialization doesn't lazy-load them;
+    # populate_existing so an order already in the session reflects the DB row
+    return (
+        db_sess.query(models.Order)
+        .populate_existing()
+        .options(selectinload(models.Order.items))
+        .filter(models.Order.order_id == order_id)
+        .first()
+    )
+
+
+# ----- Payment + Delivery (shared by create_order and the outbox dispatcher) -----
+
+async def charge_order(client, db_sess: Session, order: models.Order, method: str,
+                       email: str | None, cid: str, retry_unavailable: bool = False):
     # 4. Call payment-service
-    payment_ok = call_payment_service(
-        client,
-        order,
-        payload.payment_method,
-        customer_email,
-        cid,
+    try:
+        payment_ok = await call_payment_service(
+            client,
+            order,
+            method,
+            email,
+            cid,
+        )
+    except PaymentServiceUnavailable:
+        # the outbox retries the event; the synchronous path fails the order as before
+        if retry_unavailable:
+            raise
+        payment_ok = False
+
+    if payment_ok:
+        values = {"payment_status": "SUCCESS", "order_status": "CONFIRMED"}
+    else:
+        values = {"order_status": "PAYMENT_FAILED", "payment_status": "FAILED"}
+    applied = await run_in_threadpool(
+        transition_order, db_sess, order, "PENDING_PAYMENT", **values,
     )
+    if not applied:
+        # the order left PENDING_PAYMENT elsewhere; don't report this outcome
+        raise HTTPException(
+            409,
+            {
+                "code": "ORDER_STATE_CONFLICT",
+                "order_id": order.order_id,
+                "correlationId": cid,
+            },
+        )
 
     if not payment_ok:
-        order.order_status = "PAYMENT_FAILED"
-        order.payment_status = "FAILED"
-        db_sess.commit()
-        ORDERS_CREATED.labels("PAYMENT_FAILED").inc()
+        ORDERS_CREATED_PAYMENT_FAILED.inc()
         raise HTTPException(
             402,
             {
@@ -274,32 +544,170 @@ def create_order(
             },
         )
 
-    # Update status after successful payment
-    order.payment_status = "SUCCESS"
-    order.order_status = "CONFIRMED"
-    db_sess.commit()
-    db_sess.refresh(order)
+    ORDERS_CREATED_CONFIRMED.inc()
+    logger.info("Order %d payment success, confirming", order.order_id)
 
-    ORDERS_CREATED.labels("CONFIRMED").inc()
-    logger.info(
-        f"Order {order.order_id} payment success, confirming",
-        extra={"correlation_id": cid},
-    )
 
+async def assign_delivery(client, db_sess: Session, order: models.Order, cid: str,
+                          retry_unavailable: bool = False):
     # 5. Call delivery-service
-    delivery_ok = call_delivery_assign(client, order.order_id, cid)
-    if delivery_ok:
-        order.order_status = "OUT_FOR_DELIVERY"
-        db_sess.commit()
-        db_sess.refresh(order)
-        logger.info(
-            f"Order {order.order_id} assigned for delivery",
-            extra={"correlation_id": cid},
+    try:
+        delivery_ok = await call_delivery_assign(client, order.order_id, cid)
+    except DeliveryServiceUnavailable:
+        # the outbox retries the event; the synchronous path leaves the order CONFIRMED
+        if retry_unavailable:
+            raise
+        delivery_ok = False
+    if delivery_ok and await run_in_threadpool(
+        transition_order, db_sess, order, "CONFIRMED",
+        order_status="OUT_FOR_DELIVERY",
+    ):
+        logger.info("Order %d assigned for delivery", order.order_id)
+
+
+async def fulfil_order(client, db_sess: Session, order: models.Order, method: str,
+                       email: str | None, cid: str):
+    await charge_order(client, db_sess, order, method, email, cid)
+    await assign_delivery(client, db_sess, order, cid)
+
+
+# ----- Outbox handler: ORDER_CREATED -----
+
+async def handle_order_created(event: models.OrderEvent):
+    data = json.loads(event.payload_json)
+    cid = data["correlation_id"]
+    # the dispatcher task is long-lived; reset so its own logs don't keep this cid
+    cid_token = cid_var.set(cid)
+
+    client = app.state.http
+    db_sess = db.SessionLocal()
+    try:
+        order = await run_in_threadpool(load_order, db_sess, event.order_id)
+        if order is None:
+            return
+
+        # resume from whatever state a previous attempt left the order in
+        if order.order_status == "PENDING_PAYMENT":
+            try:
+                await charge_order(client, db_sess, order, data["payment_method"],
+                                   data["customer_email"], cid, retry_unavailable=True)
+            except HTTPException as e:
+                # payment failure / state conflict are outcomes, not retryable errors
+                logger.info("Order %d not fulfilled: %s", order.order_id, e.detail["code"])
+                return
+
+        if order.order_status == "CONFIRMED":
+            # raises while delivery-service is unavailable, so the event is
+            # retried from CONFIRMED and the customer isn't notified yet
+            await assign_delivery(client, db_sess, order, cid, retry_unavailable=True)
+
+        if order.order_status not in ("CONFIRMED", "OUT_FOR_DELIVERY"):
+            return  # terminal (e.g. PAYMENT_FAILED) or changed elsewhere
+
+        await notify(
+            client,
+            "ORDER_CREATED",
+            data["customer_email"],
+            f"Order #{order.order_id} placed successfully",
+            f"Your order total is {order.order_total}. Status: {order.order_status}",
+            cid,
         )
+    finally:
+        db_sess.close()
+        cid_var.reset(cid_token)
 
-    # 6. Notification to customer
+
+# ----- API: Create Order (Main Orchestration) -----
+
+
+@app.post(
+    "/v1/orders",
+    response_model=schemas.OrderRead,
+    status_code=201,
+    responses={
+        202: {
+            "model": schemas.OrderRead,
+            "description": "Accepted; fulfilment runs from the outbox",
+        },
+    },
+)
+async def create_order(
+    payload: schemas.CreateOrderRequest,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db_sess: Session = Depends(get_db),
+    cid: str = Depends(get_correlation_id),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    """
+    Orchestration flow:
+    1. Validate customer + address via customer-service.
+    2. Validate restaurant + items via restaurant-service (concurrently with 1).
+    3. Create order + order_items locally.
+    4. Call payment-service.
+    5. On success → call delivery-service.
+    6. Send notifications (in the background, after the response).
+
+    With USE_OUTBOX, steps 4-6 are run by the outbox dispatcher instead and
+    the order is returned as 202 PENDING_PAYMENT.
+    """
+    # 1 + 2. Validate customer & address and restaurant & items concurrently;
+    #        the total is computed from authoritative prices
+    if USE_AGGREGATOR:
+        customer_email, valid = await prepare_order(client, payload, cid)
+    elif payload.customer_email:
+        customer_email = payload.customer_email
+        valid = await validate_restaurant_and_items(
+            client,
+            payload.restaurant_id,
+            payload.items,
+            cid,
+        )
+    else:
+        customer_email, valid = await asyncio.gather(
+            validate_customer_and_address(
+                client,
+                payload.customer_id,
+                payload.address_id,
+                cid,
+            ),
+            validate_restaurant_and_items(
+                client,
+                payload.restaurant_id,
+                payload.items,
+                cid,
+            ),
+        )
+
+    total = valid.total
+    items_details = valid.items
+
+    # 3. Create order & order_items in DB (initially PENDING_PAYMENT)
+    event = {
+        "payment_method": payload.payment_method,
+        "customer_email": customer_email,
+        "correlation_id": cid,
+    } if USE_OUTBOX else None
+    order = await run_in_threadpool(
+        create_pending_order, db_sess, payload, total, items_details, event,
+    )
+
+    logger.info("Order %d created pending payment", order.order_id)
+
+    if USE_OUTBOX:
+        # order + ORDER_CREATED event were committed together; the dispatcher
+        # takes it from here
+        response.status_code = 202
+        return await run_in_threadpool(load_order, db_sess, order.order_id)
+
+    # 4 + 5. Payment, then delivery
+    await fulfil_order(client, db_sess, order, payload.payment_method, customer_email, cid)
+
+    # 6. Notification to customer (sent after the response is returned)
     if customer_email:
-        notify(
+        background_tasks.add_task(
+            notify,
+            client,
             "ORDER_CREATED",
             customer_email,
             f"Order #{order.order_id} placed successfully",
@@ -307,9 +715,8 @@ def create_order(
             cid,
         )
 
-    # reload items for response
-    db_sess.refresh(order)
-    return order
+    # load items for response
+    return await run_in_threadpool(load_order, db_sess, order.order_id)
 
 
 # ----- API: Get Order by ID -----
@@ -321,11 +728,7 @@ def get_order(
     db_sess: Session = Depends(get_db),
     cid: str = Depends(get_correlation_id),
 ):
-    order = (
-        db_sess.query(models.Order)
-        .filter(models.Order.order_id == order_id)
-        .first()
-    )
+    order = load_order(db_sess, order_id)
     if not order:
         raise HTTPException(
             404,
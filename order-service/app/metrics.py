@@ -22,6 +22,16 @@ ORDERS_CREATED = Counter(
     ["status"]
 )
 
+# pre-bound children so the hot path skips the per-call label lookup
+ORDERS_CREATED_CONFIRMED = ORDERS_CREATED.labels("CONFIRMED")
+ORDERS_CREATED_PAYMENT_FAILED = ORDERS_CREATED.labels("PAYMENT_FAILED")
+
+OUTBOX_EVENTS_FAILED = Counter(
+    "outbox_events_failed_total",
+    "Outbox events that exhausted their retries",
+    ["event_type"]
+)
+
 
 class MetricsMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, service_name: str):
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Text
 from sqlalchemy.orm import declarative_base, relationship
-from datetime import datetime
+from sqlalchemy.sql import func
 
 Base = declarative_base()
 
@@ -13,9 +13,9 @@ class Order(Base):
     restaurant_id = Column(Integer, nullable=False, index=True)
     address_id = Column(Integer, nullable=True, index=True)
     order_status = Column(String(50), nullable=False, default="PENDING_PAYMENT")
-    order_total = Column(Float, nullable=False, default=0.0)
+    order_total = Column(Numeric(10, 2), nullable=False, default=0)
     payment_status = Column(String(50), nullable=False, default="PENDING")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
@@ -27,6 +27,22 @@ class OrderItem(Base):
     order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False, index=True)
     item_id = Column(Integer, nullable=False)
     quantity = Column(Integer, nullable=False)
-    price = Column(Float, nullable=False)  # snapshot of price at order time
+    price = Column(Numeric(10, 2), nullable=False)  # snapshot of price at order time
 
     order = relationship("Order", back_populates="items")
+
+
+class OrderEvent(Base):
+    """Transactional outbox: written with the order, dispatched asynchronously."""
+
+    __tablename__ = "order_events"
+
+    event_id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False, index=True)
+    event_type = Column(String(50), nullable=False)
+    payload_json = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="PENDING", index=True)  # PENDING / PROCESSING / DONE / FAILED
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # lease start while PROCESSING
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # backoff after a failed attempt
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from . import db, models
+from .metrics import OUTBOX_EVENTS_FAILED
+
+logger = logging.getLogger("order-service")
+
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+# retry delay doubles per attempt (2s, 4s, 8s, ... capped), so with the
+# defaults an event rides out roughly a 15-minute downstream outage
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+# PROCESSING events older than this are assumed abandoned (crash, killed
+# shutdown) and handed out again
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+
+Handler = Callable[[models.OrderEvent], Awaitable[None]]
+
+
+def add_event(db_sess: Session, order_id: int, event_type: str, payload: dict) -> None:
+    # caller commits, so the event lands in the same transaction as the order
+    db_sess.add(models.OrderEvent(
+        order_id=order_id,
+        event_type=event_type,
+        payload_json=json.dumps(payload),
+    ))
+
+
+def fetch_pending(limit: int, event_types: Iterable[str]) -> list[models.OrderEvent]:
+    with db.SessionLocal() as s:
+        return (
+            s.query(models.OrderEvent)
+            .filter(
+                models.OrderEvent.status == "PENDING",
+                models.OrderEvent.event_type.in_(list(event_types)),
+                or_(
+                    models.OrderEvent.next_attempt_at.is_(None),
+                    models.OrderEvent.next_attempt_at <= datetime.now(timezone.utc),
+                ),
+            )
+            .order_by(models.OrderEvent.event_id)
+            .limit(limit)
+            .all()
+        )
+
+
+def set_status(event_id: int, from_status: str, to_status: str, **values) -> bool:
+    # guarded UPDATE, so only one dispatcher can claim an event
+    with db.SessionLocal() as s:
+        result = s.execute(
+            update(models.OrderEvent)
+            .where(
+                models.OrderEvent.event_id == event_id,
+                models.OrderEvent.status == from_status,
+            )
+            .values(status=to_status, **values)
+        )
+        s.commit()
+        return result.rowcount == 1
+
+
+def claim(event_id: int) -> bool:
+    return set_status(event_id, "PENDING", "PROCESSING", claimed_at=datetime.now(timezone.utc))
+
+
+def record_failure(event: models.OrderEvent) -> None:
+    attempts = event.attempts + 1
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        if set_status(event.event_id, "PROCESSING", "FAILED", attempts=attempts):
+            logger.error("Outbox event %d (%s) for order %d FAILED after %d attempts",
+                         event.event_id, event.event_type, event.order_id, attempts)
+            OUTBOX_EVENTS_FAILED.labels(event.event_type).inc()
+        return
+
+    delay = min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+    set_status(event.event_id, "PROCESSING", "PENDING", attempts=attempts,
+               next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=delay))
+
+
+def reclaim_expired() -> None:
+    # an expired lease counts as a failed attempt, so a poison event can't loop forever
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    expired = (
+        models.OrderEvent.status == "PROCESSING",
+        models.OrderEvent.claimed_at < cutoff,
+    )
+    with db.SessionLocal() as s:
+        failed = s.execute(
+            update(models.OrderEvent)
+            .where(*expired, models.OrderEvent.attempts + 1 >= OUTBOX_MAX_ATTEMPTS)
+            .values(status="FAILED", attempts=models.OrderEvent.attempts + 1)
+            .returning(models.OrderEvent.event_id, models.OrderEvent.event_type,
+                       models.OrderEvent.order_id)
+        ).all()
+        s.execute(
+            update(models.OrderEvent)
+            .where(*expired)
+            .values(status="PENDING", attempts=models.OrderEvent.attempts + 1)
+        )
+        s.commit()
+
+    for event_id, event_type, order_id in failed:
+        logger.error("Outbox event %d (%s) for order %d FAILED after its lease expired",
+                     event_id, event_type, order_id)
+        OUTBOX_EVENTS_FAILED.labels(event_type).inc()
+
+
+async def _dispatch_batch(handlers: Dict[str, Handler], stop: asyncio.Event) -> int:
+    await run_in_threadpool(reclaim_expired)
+    events = await run_in_threadpool(fetch_pending, OUTBOX_BATCH_SIZE, handlers.keys())
+    for event in events:
+        if stop.is_set():
+            break
+        if not await run_in_threadpool(claim, event.event_id):
+            continue  # claimed by another worker
+
+        try:
+            await handlers[event.event_type](event)
+        except Exception as e:
+            logger.warning("Outbox event %d (%s) failed: %s",
+                           event.event_id, event.event_type, e)
+            await run_in_threadpool(record_failure, event)
+        else:
+            await run_in_threadpool(set_status, event.event_id, "PROCESSING", "DONE")
+    return len(events)
+
+
+async def dispatch_forever(handlers: Dict[str, Handler], stop: asyncio.Event):
+    """Poll the outbox and hand each claimed event to its handler until `stop` is set.
+
+    Events are retried until OUTBOX_MAX_ATTEMPTS. Errors outside a handler (e.g. a
+    locked database) are logged and the loop carries on after the poll interval.
+    """
+    while not stop.is_set():
+        try:
+            dispatched = await _dispatch_batch(handlers, stop)
+        except Exception:
+            logger.exception("Outbox dispatch failed; retrying")
+            dispatched = 0
+
+        if dispatched < OUTBOX_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
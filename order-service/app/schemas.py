@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from decimal import Decimal
+import msgspec
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 
 
@@ -22,8 +24,7 @@ class OrderItemRead(BaseModel):
     quantity: int
     price: float
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class OrderRead(BaseModel):
@@ -36,5 +37,26 @@ class OrderRead(BaseModel):
     payment_status: str
     items: List[OrderItemRead]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ----- Internal downstream responses (msgspec: decoded straight from bytes) -----
+
+
+class ValidatedItem(msgspec.Struct):
+    item_id: int
+    quantity: int
+    unit_price: Decimal
+
+
+class ValidateItemsResponse(msgspec.Struct):
+    # total/items are only sent with valid=true; None/[] lets callers reject
+    # a "valid" body that is missing them
+    valid: bool
+    reason: Optional[str] = None
+    total: Optional[Decimal] = None
+    items: List[ValidatedItem] = []
+
+
+class PrepareOrderResponse(ValidateItemsResponse):
+    customer_email: Optional[str] = None
@@ -0,0 +1,51 @@
+import os
+from opentelemetry import baggage, context, trace
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+# Exporter endpoint is read by the SDK from OTEL_EXPORTER_OTLP_ENDPOINT;
+# tracing stays off when it isn't set.
+TRACING_ENABLED = bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.05"))
+
+
+class CorrelationBaggageMiddleware(BaseHTTPMiddleware):
+    """Carry an incoming X-Correlation-Id as W3C baggage so it follows the trace."""
+
+    async def dispatch(self, request: Request, call_next):
+        cid = request.headers.get("x-correlation-id")
+        if not cid:
+            return await call_next(request)
+
+        trace.get_current_span().set_attribute("correlation_id", cid)
+        token = context.attach(baggage.set_baggage("correlation_id", cid))
+        try:
+            return await call_next(request)
+        finally:
+            context.detach(token)
+
+
+def setup_tracing(app, engine, service_name: str):
+    if not TRACING_ENABLED:
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+    # added before instrument_app so it runs inside the server span
+    app.add_middleware(CorrelationBaggageMiddleware)
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
+    HTTPXClientInstrumentor().instrument(tracer_provider=provider)
+    SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=provider)
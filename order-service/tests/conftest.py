@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+# point the app at a throwaway database before it's imported (init_db runs at import)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "orders.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import delete
+
+from app import db, main, models
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    yield
+    with db.SessionLocal() as s:
+        for table in (models.OrderEvent, models.OrderItem, models.Order):
+            s.execute(delete(table))
+        s.commit()
+
+
+@pytest.fixture(autouse=True)
+def http_client():
+    # the outbox handler uses the app's shared client; respx patches its transport
+    main.app.state.http = httpx.AsyncClient()
+    yield main.app.state.http
+    asyncio.run(main.app.state.http.aclose())
@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+import respx
+from sqlalchemy import update
+
+from app import db, main, models, outbox, schemas
+
+HANDLERS = {"ORDER_CREATED": main.handle_order_created}
+
+
+def create_order(status: str = "PENDING_PAYMENT") -> int:
+    payload = schemas.CreateOrderRequest(
+        customer_id=7,
+        restaurant_id=1,
+        items=[schemas.OrderItemRequest(item_id=1, quantity=2)],
+    )
+    items = [schemas.ValidatedItem(item_id=1, quantity=2, unit_price=Decimal("5.25"))]
+    event = {"payment_method": "CARD", "customer_email": "c@example.com", "correlation_id": "cid-1"}
+    with db.SessionLocal() as s:
+        order = main.create_pending_order(s, payload, Decimal("10.50"), items, event)
+        if status != "PENDING_PAYMENT":
+            main.transition_order(s, order, "PENDING_PAYMENT", order_status=status)
+        return order.order_id
+
+
+def get_event(order_id: int) -> models.OrderEvent:
+    with db.SessionLocal() as s:
+        return s.query(models.OrderEvent).filter_by(order_id=order_id).one()
+
+
+def get_status(order_id: int) -> str:
+    with db.SessionLocal() as s:
+        return s.get(models.Order, order_id).order_status
+
+
+def make_due(event_id: int, **values):
+    # skip the backoff wait instead of sleeping through it
+    with db.SessionLocal() as s:
+        s.execute(
+            update(models.OrderEvent)
+            .where(models.OrderEvent.event_id == event_id)
+            .values(next_attempt_at=None, **values)
+        )
+        s.commit()
+
+
+def dispatch():
+    return asyncio.run(outbox._dispatch_batch(HANDLERS, asyncio.Event()))
+
+
+@respx.mock
+def test_payment_unavailable_backs_off_then_fails(monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 3)
+    charge = respx.post(main.PAYMENT_CHARGE_URL).respond(503)
+    order_id = create_order()
+
+    dispatch()
+    event = get_event(order_id)
+    assert (event.status, event.attempts) == ("PENDING", 1)
+    assert event.next_attempt_at is not None
+
+    # still backing off: not handed out again
+    dispatch()
+    assert charge.call_count == 1
+
+    make_due(event.event_id)
+    dispatch()
+    event = get_event(order_id)
+    assert (event.status, event.attempts) == ("PENDING", 2)
+
+    make_due(event.event_id)
+    dispatch()
+    event = get_event(order_id)
+    assert (event.status, event.attempts) == ("FAILED", 3)
+    assert charge.call_count == 3
+    assert get_status(order_id) == "PENDING_PAYMENT"
+
+
+@respx.mock
+def test_delivery_unavailable_is_retried_from_confirmed():
+    charge = respx.post(main.PAYMENT_CHARGE_URL).respond(201, json={"status": "SUCCESS"})
+    assign = respx.post(main.DELIVERY_ASSIGN_URL).respond(503)
+    email = respx.post(main.NOTIFICATION_EMAIL_URL).respond(201)
+    order_id = create_order()
+
+    dispatch()
+    event = get_event(order_id)
+    assert (event.status, event.attempts) == ("PENDING", 1)
+    assert get_status(order_id) == "CONFIRMED"
+    assert not email.called
+
+    assign.respond(201)
+    make_due(event.event_id)
+    dispatch()
+    assert get_event(order_id).status == "DONE"
+    assert get_status(order_id) == "OUT_FOR_DELIVERY"
+    # resumed from CONFIRMED: the customer is charged exactly once
+    assert charge.call_count == 1
+    assert email.call_count == 1
+
+
+@respx.mock
+def test_resume_from_confirmed_skips_payment():
+    charge = respx.post(main.PAYMENT_CHARGE_URL).respond(201, json={"status": "SUCCESS"})
+    respx.post(main.DELIVERY_ASSIGN_URL).respond(201)
+    respx.post(main.NOTIFICATION_EMAIL_URL).respond(201)
+    order_id = create_order(status="CONFIRMED")
+
+    dispatch()
+    assert get_event(order_id).status == "DONE"
+    assert get_status(order_id) == "OUT_FOR_DELIVERY"
+    assert not charge.called
+
+
+@pytest.mark.parametrize("attempts, expected", [(0, "PENDING"), (2, "FAILED")])
+def test_expired_lease_is_reclaimed(monkeypatch, attempts, expected):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 3)
+    order_id = create_order()
+    event_id = get_event(order_id).event_id
+    assert outbox.claim(event_id)
+
+    # a live lease is left alone
+    outbox.reclaim_expired()
+    assert get_event(order_id).status == "PROCESSING"
+
+    expired = datetime.now(timezone.utc) - timedelta(seconds=outbox.OUTBOX_LEASE_SECONDS + 1)
+    with db.SessionLocal() as s:
+        s.execute(
+            update(models.OrderEvent)
+            .where(models.OrderEvent.event_id == event_id)
+            .values(claimed_at=expired, attempts=attempts)
+        )
+        s.commit()
+
+    outbox.reclaim_expired()
+    event = get_event(order_id)
+    assert (event.status, event.attempts) == (expected, attempts + 1)
+
+
+def test_claim_lost_to_another_worker_is_skipped(monkeypatch):
+    order_id = create_order()
+    pending = outbox.fetch_pending(10, HANDLERS)
+    # another dispatcher claims the event between our fetch and our claim
+    assert outbox.claim(pending[0].event_id)
+    assert not outbox.claim(pending[0].event_id)
+
+    handled = []
+
+    async def handler(event):
+        handled.append(event.event_id)
+
+    monkeypatch.setattr(outbox, "fetch_pending", lambda limit, event_types: pending)
+    asyncio.run(outbox._dispatch_batch({"ORDER_CREATED": handler}, asyncio.Event()))
+
+    assert handled == []
+    assert get_event(order_id).status == "PROCESSING"
+
+
+@respx.mock
+def test_handler_restores_correlation_id():
+    respx.post(main.PAYMENT_CHARGE_URL).respond(503)
+    order_id = create_order()
+
+    async def run():
+        await outbox._dispatch_batch(HANDLERS, asyncio.Event())
+        return main.cid_var.get()
+
+    assert asyncio.run(run()) == "-"
+    assert get_event(order_id).attempts == 1